@@ -3,10 +3,11 @@
 数据加载模块
 """
 
-import json
 import os
 from typing import List, Dict, Optional
 
+import orjson
+
 
 class DataLoader:
     """数据加载器"""
@@ -45,21 +46,51 @@ class DataLoader:
         
         return self.sentences
     
+    # 大文件读取的缓冲区大小（1 MiB）
+    _READ_BUFFER_SIZE = 1 << 20
+
     def _load_from_txt(self, file_path: str) -> List[str]:
         """从txt文件加载，每行一个句子"""
-        sentences = []
-        with open(file_path, "r", encoding="utf-8") as f:
+        # 大缓冲区 + 列表推导：读取循环在 C 层完成，
+        # 只 strip 一次，避免逐行 append 的 Python 开销
+        with open(file_path, "r", encoding="utf-8", buffering=self._READ_BUFFER_SIZE) as f:
+            return [s for s in (line.strip() for line in f) if s]
+
+    def iter_from_txt(self, file_path: str):
+        """
+        流式逐行读取 txt 文件，不在内存中物化整个列表
+
+        适合超大文件，调用方可以边读边处理
+
+        Args:
+            file_path: 文件路径
+
+        Yields:
+            句子字符串
+        """
+        with open(file_path, "r", encoding="utf-8", buffering=self._READ_BUFFER_SIZE) as f:
             for line in f:
                 line = line.strip()
                 if line:
-                    sentences.append(line)
-        return sentences
+                    yield line
     
+    # 超过该大小的 JSON 文件改用 ijson 流式解析（16 MiB）
+    _STREAMING_JSON_THRESHOLD = 16 << 20
+
     def _load_from_json(self, file_path: str) -> List[str]:
         """从json文件加载"""
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        
+        # 大文件走 ijson 流式解析，避免整棵 JSON 树同时驻留内存；
+        # 小文件仍用 orjson 一次性解析，省去流式解析的启动开销
+        if os.path.getsize(file_path) >= self._STREAMING_JSON_THRESHOLD:
+            try:
+                return list(self.iter_from_json(file_path))
+            except ImportError:
+                pass  # 未安装 ijson 时退回内存解析
+
+        # orjson 直接解析 bytes，比 stdlib json 快数倍
+        with open(file_path, "rb") as f:
+            data = orjson.loads(f.read())
+
         # 支持两种格式：
         # 1. 直接是句子列表 ["sentence1", "sentence2", ...]
         # 2. 字典格式 {"sentences": ["sentence1", "sentence2", ...]}
@@ -69,6 +100,52 @@ class DataLoader:
             return data["sentences"]
         else:
             raise ValueError("JSON格式不正确，应为列表或包含'sentences'键的字典")
+
+    def iter_from_json(self, file_path: str):
+        """
+        流式解析 JSON 文件，逐个产出句子而不物化整棵 JSON 树
+
+        基于 ijson 的 SAX 式解析，内存占用与文件大小无关
+        支持与 _load_from_json 相同的两种格式（列表 / 含'sentences'键的字典）
+
+        Args:
+            file_path: 文件路径
+
+        Yields:
+            句子字符串
+        """
+        try:
+            import ijson
+        except ImportError as e:
+            raise ImportError(
+                f"无法导入 ijson 库，请先安装: pip install ijson\n"
+                f"原始错误: {e}"
+            )
+
+        # ijson 需要二进制流；根据首个非空白字节判断顶层结构
+        with open(file_path, "rb") as f:
+            first = f.read(1)
+            while first.isspace():
+                first = f.read(1)
+            f.seek(0)
+
+            if first == b"[":
+                for sentence in ijson.items(f, "item"):
+                    yield sentence
+            elif first == b"{":
+                # 逐事件解析并确认 'sentences' 数组确实存在：
+                # 仅靠 items() 无法区分"键缺失"和"空列表"，
+                # 格式错误的大文件会悄悄返回空结果
+                found_sentences = False
+                for prefix, event, value in ijson.parse(f):
+                    if prefix == "sentences" and event == "start_array":
+                        found_sentences = True
+                    elif prefix == "sentences.item" and event == "string":
+                        yield value
+                if not found_sentences:
+                    raise ValueError("JSON格式不正确，应为列表或包含'sentences'键的字典")
+            else:
+                raise ValueError("JSON格式不正确，应为列表或包含'sentences'键的字典")
     
     def load_from_list(self, sentences: List[str]) -> List[str]:
         """
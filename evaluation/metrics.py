@@ -12,50 +12,114 @@
 """
 
 from typing import List, Dict, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
+import numpy as np
 
-@dataclass
+
+# slots=True 省掉每实例的 __dict__，大规模评估时显著降低内存占用
+@dataclass(slots=True)
 class DetectionResult:
     """单个句子的检测结果"""
     sentence: str
     has_error_detected: bool  # 模型是否检测到错误
     corrected_sentence: str = ""  # 纠正后的句子（可选）
-    error_details: List[Dict] = None  # 错误详情（可选）
+    error_details: List[Dict] = field(default_factory=list)  # 错误详情（可选）
 
 
 class MetricsCalculator:
     """评估指标计算器"""
     
+    # 检测标记数组的初始容量
+    _INITIAL_CAPACITY = 1024
+
     def __init__(self):
-        self.results: List[DetectionResult] = []
-    
+        # SoA（列式）存储：检测标记放在连续的 bool 数组中，
+        # 句子/纠正结果/错误详情放在平行列表里
+        # 相比 List[DetectionResult]，统计 TP 时无需逐对象取属性，
+        # np.count_nonzero 对 bool 数组是一次向量化的 C 循环
+        self._detected = np.zeros(self._INITIAL_CAPACITY, dtype=bool)
+        self._sentences: List[str] = []
+        self._corrected: List[str] = []
+        self._errors: List[List] = []
+        self._n = 0
+        # TP/总数随 record/add_result 增量维护，指标计算只读计数器
+        self._tp = 0
+
+    def record(self, detected: bool):
+        """
+        仅记录检测标记，不保存句子详情
+
+        评估主循环里详情已直接写入 JSONL 文件时用此方法，
+        免去构造 DetectionResult 对象的分配开销；
+        记录的结果不出现在 get_detailed_results 中
+
+        Args:
+            detected: 模型是否检测到错误
+        """
+        self._tp += detected
+        self._n += 1
+
+    def _ensure_capacity(self, needed: int):
+        """
+        容量不足时按倍增策略扩展检测标记数组
+
+        数组的填充水位是 len(self._sentences)（只有 add_result 写入），
+        不能用 self._n —— record() 也会递增 _n 但不触碰数组
+        """
+        capacity = len(self._detected)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        stored = len(self._sentences)
+        new_detected = np.zeros(capacity, dtype=bool)
+        new_detected[:stored] = self._detected[:stored]
+        self._detected = new_detected
+
     def add_result(self, result: DetectionResult):
-        """添加单个检测结果"""
-        self.results.append(result)
-    
+        """添加单个检测结果（保留详情，供 get_detailed_results 使用）"""
+        self._ensure_capacity(len(self._sentences) + 1)
+        self._detected[len(self._sentences)] = result.has_error_detected
+        self._sentences.append(result.sentence)
+        self._corrected.append(result.corrected_sentence)
+        self._errors.append(result.error_details)
+        self._tp += int(result.has_error_detected)
+        self._n += 1
+
     def add_results(self, results: List[DetectionResult]):
         """批量添加检测结果"""
-        self.results.extend(results)
-    
+        self._ensure_capacity(len(self._sentences) + len(results))
+        for result in results:
+            self.add_result(result)
+
     def clear(self):
         """清空结果"""
-        self.results = []
-    
+        self._detected = np.zeros(self._INITIAL_CAPACITY, dtype=bool)
+        self._sentences = []
+        self._corrected = []
+        self._errors = []
+        self._n = 0
+        self._tp = 0
+
+    def __len__(self) -> int:
+        """返回已添加的结果数量"""
+        return self._n
+
     def _count_tp_fn(self) -> Tuple[int, int]:
         """
         统计 TP 和 FN
-        
+
         由于所有输入句子都是错误句子（正样本）：
         - TP: 模型正确检测到错误的句子数
         - FN: 模型未能检测到错误的句子数
-        
+
+        计数随 record/add_result 增量维护，此处 O(1) 返回
+
         Returns:
             (TP, FN) 元组
         """
-        tp = sum(1 for r in self.results if r.has_error_detected)
-        fn = len(self.results) - tp
-        return tp, fn
+        return self._tp, self._n - self._tp
     
     def calculate_recall(self) -> float:
         """
@@ -65,9 +129,9 @@ class MetricsCalculator:
         在本场景下，所有样本都是正样本，因此：
         Recall = 检测到错误的句子数 / 总句子数
         """
-        if len(self.results) == 0:
+        if self._n == 0:
             return 0.0
-        
+
         tp, fn = self._count_tp_fn()
         total = tp + fn
         
@@ -108,16 +172,8 @@ class MetricsCalculator:
                   - beta > 1: 更重视 Recall
             fp: False Positive 数量（默认为0）
         """
-        precision = self.calculate_precision(fp)
-        recall = self.calculate_recall()
-        
-        if precision + recall == 0:
-            return 0.0
-        
-        beta_squared = beta ** 2
-        f_score = (1 + beta_squared) * (precision * recall) / (beta_squared * precision + recall)
-        
-        return f_score
+        tp, fn = self._count_tp_fn()
+        return self._fbeta(tp, fn, fp, beta)
     
     def calculate_f05(self, fp: int = 0) -> float:
         """计算 F0.5 分数（更重视 Precision）"""
@@ -131,47 +187,73 @@ class MetricsCalculator:
         """计算 F2 分数（更重视 Recall）"""
         return self.calculate_f_score(beta=2.0, fp=fp)
     
+    @staticmethod
+    def _fbeta(tp: int, fn: int, fp: int, beta: float) -> float:
+        """
+        由 TP/FN/FP 计数直接计算 F_beta
+
+        闭式 F_beta = (1+b²)·TP / ((1+b²)·TP + b²·FN + FP)
+        与 P/R 形式代数等价，但省去中间除法，
+        且在 P 或 R 极小时没有 b²·P + R 的抵消问题
+        """
+        beta_squared = beta * beta
+        denom = (1 + beta_squared) * tp + beta_squared * fn + fp
+        return (1 + beta_squared) * tp / denom if denom else 0.0
+
     def calculate_all_metrics(self, fp: int = 0) -> Dict[str, float]:
         """
         计算所有评估指标
-        
+
+        TP/FN 只统计一次，P/R 只计算一次，
+        三个 F-score 共享同一组中间值，而不是各自重新走一遍统计
+
         Args:
             fp: False Positive 数量（默认为0）
-            
+
         Returns:
             包含所有指标的字典
         """
         tp, fn = self._count_tp_fn()
-        
+        total = tp + fn
+
+        precision = tp / (tp + fp) if tp + fp else 0.0
+        recall = tp / total if total else 0.0
+
         return {
-            "total_sentences": len(self.results),
+            "total_sentences": total,
             "true_positive": tp,
             "false_negative": fn,
             "false_positive": fp,
-            "precision": self.calculate_precision(fp),
-            "recall": self.calculate_recall(),
-            "f0.5": self.calculate_f05(fp),
-            "f1": self.calculate_f1(fp),
-            "f2": self.calculate_f2(fp),
+            "precision": precision,
+            "recall": recall,
+            "f0.5": self._fbeta(tp, fn, fp, 0.5),
+            "f1": self._fbeta(tp, fn, fp, 1.0),
+            "f2": self._fbeta(tp, fn, fp, 2.0),
         }
     
     def get_detailed_results(self) -> List[Dict]:
         """
         获取详细的检测结果
-        
+
+        仅包含通过 add_result 添加的结果；
+        record() 只记录计数，不保存详情
+
         Returns:
             每个句子的检测详情列表
         """
-        detailed = []
-        for i, result in enumerate(self.results):
-            detailed.append({
+        detected = self._detected[:len(self._sentences)].tolist()
+        return [
+            {
                 "index": i,
-                "sentence": result.sentence,
-                "detected": result.has_error_detected,
-                "corrected": result.corrected_sentence,
-                "details": result.error_details,
-            })
-        return detailed
+                "sentence": sentence,
+                "detected": flag,
+                "corrected": corrected,
+                "details": errors,
+            }
+            for i, (sentence, flag, corrected, errors) in enumerate(
+                zip(self._sentences, detected, self._corrected, self._errors)
+            )
+        ]
     
     def print_summary(self, fp: int = 0):
         """打印评估摘要"""
@@ -5,14 +5,17 @@
 使用 pycorrector 中的模型对错误句子数据集进行检错评估
 """
 
-import json
 import os
 from datetime import datetime
+
+import numpy as np
+import orjson
+from tqdm import tqdm
 from typing import List, Dict
 
 from data.data_loader import DataLoader
 from models.macbert_csc import MacBertCSCCorrector
-from evaluation.metrics import MetricsCalculator, DetectionResult
+from evaluation.metrics import MetricsCalculator
 from config.settings import OUTPUT_DIR, RESULTS_DIR
 
 
@@ -56,82 +59,107 @@ def run_evaluation(
     
     if verbose:
         print(f"开始对 {len(sentences)} 个句子进行检错...")
-    
+
     # 进行纠错并收集结果
     calculator = MetricsCalculator()
-    detailed_results = []
-    
-    for i, sentence in enumerate(sentences):
-        result = corrector.correct(sentence)
-        
-        # 添加到评估计算器
-        detection_result = DetectionResult(
-            sentence=sentence,
-            has_error_detected=result.has_error,
-            corrected_sentence=result.corrected,
-            error_details=result.errors
-        )
-        calculator.add_result(detection_result)
-        
-        # 记录详细结果
-        detailed_results.append({
-            "index": i,
-            "original": sentence,
-            "corrected": result.corrected,
-            "detected": result.has_error,
-            "errors": result.errors
-        })
-        
-        # 进度提示
-        if verbose and (i + 1) % 100 == 0:
-            print(f"已处理: {i + 1}/{len(sentences)}")
-    
+
+    # 详细结果逐行流式写入 JSONL，而不是在内存里攒一个大列表：
+    # 内存占用与数据集规模无关，下游也可以按行扫描
+    detail_file = None
+    detail_f = None
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if save_results:
+        # 二进制模式直接写 orjson 输出的 bytes，省去 UTF-8 编码往返
+        detail_file = os.path.join(RESULTS_DIR, f"{model_name}_results_{timestamp}.jsonl")
+        detail_f = open(detail_file, "wb", buffering=1 << 20)
+
+    try:
+        # 分块批量推理：每块内部由模型一次性批量前向
+        # tqdm 以限速的单行刷新方式显示进度，开销远低于逐段 print
+        chunk_size = 64
+        with tqdm(total=len(sentences), disable=not verbose, desc="CSC", unit="sent") as pbar:
+            for start in range(0, len(sentences), chunk_size):
+                chunk = sentences[start:start + chunk_size]
+                results = corrector.correct_batch(chunk)
+
+                for i, (sentence, result) in enumerate(zip(chunk, results), start=start):
+                    # 只记录检测标记：详情直接落盘，
+                    # 无需构造中间 DetectionResult 对象
+                    calculator.record(result.has_error)
+
+                    # 详细结果直接落盘
+                    if detail_f is not None:
+                        entry = {
+                            "index": i,
+                            "original": sentence,
+                            "corrected": result.corrected,
+                            "detected": result.has_error,
+                            "errors": result.errors
+                        }
+                        detail_f.write(orjson.dumps(entry) + b"\n")
+
+                pbar.update(len(chunk))
+    finally:
+        if detail_f is not None:
+            detail_f.close()
+
     # 计算指标
     metrics = calculator.calculate_all_metrics()
-    
+
     # 打印摘要
     if verbose:
         calculator.print_summary()
-    
-    # 构建完整结果
+
+    # 构建完整结果（不含详细结果，详细结果在 JSONL 文件中）
     full_results = {
         "model_name": corrector.get_model_name(),
         "timestamp": datetime.now().isoformat(),
         "metrics": metrics,
-        "detailed_results": detailed_results
+        "detail_file": detail_file
     }
-    
-    # 保存结果
+
+    # 保存摘要
     if save_results:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        result_file = os.path.join(RESULTS_DIR, f"{model_name}_results_{timestamp}.json")
-        
-        with open(result_file, "w", encoding="utf-8") as f:
-            json.dump(full_results, f, ensure_ascii=False, indent=2)
-        
+        summary_file = os.path.join(RESULTS_DIR, f"{model_name}_summary_{timestamp}.json")
+
+        with open(summary_file, "wb") as f:
+            f.write(orjson.dumps(full_results, option=orjson.OPT_INDENT_2))
+
         if verbose:
-            print(f"结果已保存到: {result_file}")
-    
+            print(f"详细结果已保存到: {detail_file}")
+            print(f"评估摘要已保存到: {summary_file}")
+
     return full_results
 
 
 def main():
-    from datasets import load_dataset
-    ds = load_dataset("shibing624/chinese_text_correction")
-    datas = ds['train'][0:1000]
     """主函数"""
-    # ===================================
-    # 在这里填入错误句子列表
-    # ===================================
-    error_sentences = [
-        # TODO: 在这里添加你的错误句子列表
-        # 示例：
-        # "今天天汽很好",
-        # "我门一起去公园",
-        # "这个问提很难",
-    ]
-    error_sentences = [src for src, label in zip(datas['source'], datas['type']) if label == 'negative']
-    
+    from datasets import load_dataset
+
+    # Arrow 列式访问：filter/select 在 C 层按列执行并行过滤，
+    # 避免先切片物化成 Python dict 再逐行比较
+    ds = load_dataset("shibing624/chinese_text_correction", split="train")
+
+    # 批量谓词：整列一次比较，省去逐行构造 example 字典的开销
+    # type 列若是 ClassLabel，则换成整数 id 比较，走 numpy 的向量化路径
+    type_feature = ds.features["type"]
+    if hasattr(type_feature, "str2int"):
+        negative_id = type_feature.str2int("negative")
+
+        def is_negative(batch):
+            return (np.asarray(batch["type"]) == negative_id).tolist()
+    else:
+        def is_negative(batch):
+            return [label == "negative" for label in batch["type"]]
+
+    negatives = ds.filter(
+        is_negative,
+        batched=True,
+        num_proc=os.cpu_count(),
+    ).select(range(1000))
+    error_sentences = negatives["source"]
+
+
     if not error_sentences:
         print("警告: 错误句子列表为空，请在 main.py 中填入数据")
         print("或使用 DataLoader 从文件加载数据")
@@ -3,18 +3,21 @@
 纠错模型基类
 """
 
+import os
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
-@dataclass
+# slots=True 省掉每实例的 __dict__，纠错结果会大量创建，内存收益明显
+@dataclass(slots=True)
 class CorrectionResult:
     """单个句子的纠错结果"""
     original: str  # 原始句子
     corrected: str  # 纠正后的句子
     has_error: bool  # 是否检测到错误
-    errors: List[Dict]  # 错误详情列表，每个错误包含位置、原字符、纠正字符等
+    errors: List[Dict] = field(default_factory=list)  # 错误详情列表，每个错误包含位置、原字符、纠正字符等
 
 
 class BaseCorrector(ABC):
@@ -48,22 +51,55 @@ class BaseCorrector(ABC):
         """
         pass
     
+    @abstractmethod
     def correct_batch(self, sentences: List[str]) -> List[CorrectionResult]:
         """
         批量纠错
-        
+
+        子类必须实现向量化的批量推理（一次前向处理整批句子），
+        不要退化为逐句调用 correct()，否则无法摊销编码与前向开销
+
         Args:
             sentences: 句子列表
-            
+
         Returns:
             CorrectionResult 列表
         """
-        results = []
-        for sentence in sentences:
-            result = self.correct(sentence)
-            results.append(result)
-        return results
-    
+        pass
+
+    def correct_batch_threaded(
+        self,
+        sentences: List[str],
+        max_workers: Optional[int] = None
+    ) -> List[CorrectionResult]:
+        """
+        线程池并行的批量纠错
+
+        供没有原生批量前向的模型封装实现 correct_batch 时复用：
+        torch / C++ 内核执行期间会释放 GIL，CPU 推理下
+        多线程逐句调用 correct() 可以接近线性加速
+
+        注意：
+        - 要求 correct() 对共享模型是无状态的（只读推理）
+        - GPU 推理请将 max_workers 设为 1，多线程只会引起争用
+
+        Args:
+            sentences: 句子列表
+            max_workers: 线程数，默认为 CPU 核数
+
+        Returns:
+            CorrectionResult 列表（顺序与输入一致）
+        """
+        # 先确保模型加载完成，避免多个线程竞争惰性加载
+        if not self.is_loaded():
+            self.load_model()
+
+        if max_workers is None:
+            max_workers = os.cpu_count()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(self.correct, sentences))
+
     def detect_error(self, sentence: str) -> bool:
         """
         检测句子是否有错误
@@ -80,14 +116,14 @@ class BaseCorrector(ABC):
     def detect_batch(self, sentences: List[str]) -> List[bool]:
         """
         批量检测错误
-        
+
         Args:
             sentences: 句子列表
-            
+
         Returns:
             布尔值列表，表示每个句子是否有错误
         """
-        return [self.detect_error(s) for s in sentences]
+        return [r.has_error for r in self.correct_batch(sentences)]
     
     def get_model_name(self) -> str:
         """获取模型名称"""
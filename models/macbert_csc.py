@@ -5,7 +5,10 @@ MacBERT-CSC 纠错模型封装
 使用 pycorrector 库中的 MacBERT-CSC 模型进行中文拼写纠错
 """
 
-from typing import List, Dict, Optional
+import os
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple
+
 from .base_model import BaseCorrector, CorrectionResult
 
 
@@ -16,25 +19,111 @@ class MacBertCSCCorrector(BaseCorrector):
     基于 pycorrector 库的 MacBertCorrector
     """
     
-    def __init__(self):
-        """初始化 MacBERT-CSC 模型"""
+    # 默认批大小：预热与 correct_batch 保持一致，
+    # 使编译特化的形状与生产形状吻合
+    _DEFAULT_BATCH_SIZE = 32
+
+    # dtype 名称到 torch dtype 属性名的映射
+    _DTYPE_MAP = {
+        "fp32": "float32",
+        "fp16": "float16",
+        "bf16": "bfloat16",
+    }
+
+    def __init__(
+        self,
+        device: Optional[str] = None,
+        dtype: str = "fp16",
+        int8: bool = False,
+        compile_model: bool = True
+    ):
+        """
+        初始化 MacBERT-CSC 模型
+
+        Args:
+            device: 推理设备，"cuda" 或 "cpu"，默认自动检测（有 GPU 则用 GPU）
+            dtype: GPU 上的推理精度，"fp16" / "bf16" / "fp32"
+                   （CPU 上忽略，始终使用 fp32）
+            int8: CPU 推理时是否对 Linear 层做 int8 动态量化
+                  （仅对 CPU 生效，GPU 上忽略）
+            compile_model: GPU 上是否用 torch.compile 编译前向
+                           （内核融合 + 形状特化，编译失败时自动退回 eager）
+        """
         super().__init__(model_name="MacBERT-CSC")
         self._corrector = None
-    
+        self._device = device
+        self._dtype_name = dtype
+        self._int8 = int8
+        self._compile_model = compile_model
+        self._compiled = False
+        self._torch = None
+        self._autocast_dtype = None
+        # tokenizer / 模型的直接引用，加载后缓存，绕过 pycorrector 封装
+        self._tokenizer = None
+        self._model_ref = None
+        # 字符是否会被解码丢弃的缓存（见 _is_dropped_char）
+        self._dropped_char_cache: Dict[str, bool] = {}
+        # 编码长度上限：中文 CSC 输入通常远短于 128 token
+        self._max_len = 128
+
     def load_model(self):
         """
         加载 MacBERT-CSC 模型
-        
+
         首次调用时会自动下载模型文件
+        加载后将模型移动到目标设备并设为推理模式，
+        GPU 上按指定精度半精度化以减少显存带宽压力
         """
         if self._corrector is not None:
             return
-        
+
         try:
+            import torch
             from pycorrector import MacBertCorrector
+            self._torch = torch
+
+            if self._device is None:
+                self._device = "cuda" if torch.cuda.is_available() else "cpu"
+
             self._corrector = MacBertCorrector("shibing624/macbert4csc-base-chinese")
             self._model = self._corrector  # 保持与基类一致
-            print(f"[{self.model_name}] 模型加载成功")
+
+            model = self._corrector.model
+            model.eval()
+
+            if self._device == "cuda":
+                # 允许 TF32，提高 Ampere+ 上 fp32 matmul 吞吐
+                torch.backends.cuda.matmul.allow_tf32 = True
+
+                if self._dtype_name not in self._DTYPE_MAP:
+                    raise ValueError(f"不支持的精度: {self._dtype_name}")
+                torch_dtype = getattr(torch, self._DTYPE_MAP[self._dtype_name])
+
+                model.to(device=self._device, dtype=torch_dtype)
+                if self._dtype_name != "fp32":
+                    self._autocast_dtype = torch_dtype
+            else:
+                # CPU 推理：用满所有物理核，让 oneDNN 选择 VNNI 等向量化内核
+                torch.set_num_threads(os.cpu_count())
+                torch.backends.mkldnn.enabled = True
+
+                if self._int8:
+                    # Linear 层权重动态量化为 int8，matmul 走 int8 内核
+                    # BERT 推理由 Linear 主导，CPU 上通常有 2~4 倍加速
+                    # 注意：首次调用会预热 oneDNN primitive 缓存，略慢
+                    self._corrector.model = torch.quantization.quantize_dynamic(
+                        model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+
+            # 缓存 tokenizer 与模型引用，推理时直接调用前向，
+            # 跳过 pycorrector.correct 内部的逐次封装开销
+            self._tokenizer = self._corrector.tokenizer
+            self._model_ref = self._corrector.model
+
+            if self._compile_model and self._device == "cuda":
+                self._try_compile()
+
+            print(f"[{self.model_name}] 模型加载成功 (device={self._device}, dtype={self._dtype_name}, int8={self._int8})")
         except ImportError as e:
             raise ImportError(
                 f"无法导入 pycorrector 库，请先安装: pip install pycorrector\n"
@@ -42,87 +131,237 @@ class MacBertCSCCorrector(BaseCorrector):
             )
         except Exception as e:
             raise RuntimeError(f"加载 {self.model_name} 模型失败: {e}")
+
+    def _try_compile(self):
+        """
+        用 torch.compile 编译前向，失败时退回 eager
+
+        reduce-overhead 模式启用 CUDA graph 捕获并融合
+        attention / LayerNorm 等内核
+        dynamic=False 下每种输入形状都会触发一次完整重编译，
+        因此编译模式改用固定 max_len padding（见 _encode_batch），
+        序列维恒为 max_len，只有末尾不满的 batch 会引入一个新形状
+        编译是惰性的，首次前向触发，预热用满批、满长度的输入
+        跑几遍，使生产形状 (batch_size, max_len) 的编译和
+        CUDA graph 捕获在加载阶段完成；预热出错同样退回 eager
+        """
+        torch = self._torch
+        eager_model = self._model_ref
+        try:
+            self._model_ref = torch.compile(
+                eager_model, mode="reduce-overhead", dynamic=False
+            )
+            self._compiled = True
+            # 预热触发实际编译，并填充 CUDA graph / 内核缓存
+            warmup_sentences = ["今天天气很好。"] * self._DEFAULT_BATCH_SIZE
+            for _ in range(3):
+                self._forward_batch(warmup_sentences)
+        except Exception as e:
+            print(f"[{self.model_name}] torch.compile 失败，退回 eager 模式: {e}")
+            self._model_ref = eager_model
+            self._compiled = False
+
+    @contextmanager
+    def _inference_ctx(self):
+        """
+        推理上下文：关闭梯度跟踪，GPU 上叠加半精度 autocast
+        """
+        torch = self._torch
+        with torch.inference_mode():
+            if self._autocast_dtype is not None:
+                with torch.autocast("cuda", dtype=self._autocast_dtype):
+                    yield
+            else:
+                yield
     
     def correct(self, sentence: str) -> CorrectionResult:
         """
         对单个句子进行纠错
-        
+
         Args:
             sentence: 输入句子
-            
+
         Returns:
             CorrectionResult 对象，包含原始句子、纠正后句子、是否有错误、错误详情
         """
-        if self._corrector is None:
-            self.load_model()
-        
-        # 调用 pycorrector 的纠错方法
-        # 返回格式为字典:
-        # {'source': '原句子', 'target': '纠正后的句子', 'errors': [('错误词', '正确词', '错误位置'), ...]}
-        result = self._corrector.correct(sentence)
-        
-        corrected_text = result.get('target', sentence)
-        error_details = result.get('errors', [])
-        
-        # 解析错误详情
-        errors = self._parse_errors(error_details)
-        
-        # 判断是否检测到错误
-        has_error = len(errors) > 0
-        
-        return CorrectionResult(
-            original=sentence,
-            corrected=corrected_text,
-            has_error=has_error,
-            errors=errors
+        return self.correct_batch([sentence])[0]
+
+    def _encode_batch(self, sentences: List[str]) -> Dict:
+        """
+        批量编码句子为模型输入张量
+
+        eager 模式 padding 到 batch 内最长句（上限 max_len），
+        配合长度分桶使同一 batch 的 padding 浪费最小；
+        编译模式固定 padding 到 max_len，保持序列维形状不变，
+        避免每个 batch 的最长句变化触发 torch.compile 重编译
+
+        Args:
+            sentences: 句子列表
+
+        Returns:
+            tokenizer 输出的张量字典（已移动到目标设备）
+        """
+        encoded = self._tokenizer(
+            sentences,
+            padding="max_length" if self._compiled else "longest",
+            truncation=True,
+            max_length=self._max_len,
+            return_tensors="pt",
         )
-    
-    def _parse_errors(self, error_details: List) -> List[Dict]:
+        if self._device == "cuda":
+            encoded = {
+                k: v.to(self._device, non_blocking=True)
+                for k, v in encoded.items()
+            }
+        return dict(encoded)
+
+    def _forward_batch(self, sentences: List[str]) -> List[CorrectionResult]:
+        """
+        对一个 batch 做一次前向并解析结果
+
+        绕过 pycorrector.correct 的逐句封装，直接调用缓存的
+        tokenizer / 模型引用：一次编码、一次前向、一次 argmax
+
+        Args:
+            sentences: 句子列表（长度不超过 batch_size）
+
+        Returns:
+            CorrectionResult 列表
+        """
+        torch = self._torch
+        encoded = self._encode_batch(sentences)
+
+        with self._inference_ctx():
+            logits = self._model_ref(**encoded).logits
+
+        token_ids = torch.argmax(logits, dim=-1).cpu()
+
+        results = []
+        for ids, sentence in zip(token_ids, sentences):
+            decoded = self._tokenizer.decode(ids, skip_special_tokens=True)
+            decoded = decoded.replace(" ", "")
+            corrected, errors = self._postprocess(sentence, decoded)
+            results.append(CorrectionResult(
+                original=sentence,
+                corrected=corrected,
+                has_error=len(errors) > 0,
+                errors=errors
+            ))
+        return results
+
+    def _is_dropped_char(self, char: str) -> bool:
+        """
+        判断字符在解码结果中是否会被丢弃
+
+        空白字符被 decode 后的去空格步骤破坏；
+        tokenizer 词表外的字符（弯引号、省略号、破折号等）编码为
+        [UNK]，又被 skip_special_tokens 移除
+        判定结果按字符缓存，避免重复调用 tokenizer
+
+        Args:
+            char: 单个字符
+
+        Returns:
+            是否会被丢弃
         """
-        解析错误详情
-        
+        if char.isspace():
+            return True
+        dropped = self._dropped_char_cache.get(char)
+        if dropped is None:
+            ids = self._tokenizer.encode(char, add_special_tokens=False)
+            dropped = (not ids) or (self._tokenizer.unk_token_id in ids)
+            self._dropped_char_cache[char] = dropped
+        return dropped
+
+    def _postprocess(self, sentence: str, decoded: str) -> Tuple[str, List[Dict]]:
+        """
+        将解码结果与原句逐字符对齐，提取错误详情
+
+        与 pycorrector 的后处理逻辑一致：
+        - 先把 tokenizer 丢弃的字符（空白、[UNK]）按原位置回插到
+          解码结果中，否则丢弃点之后的字符会整体错位，
+          产生大量位置错误的假错误
+        - 解码结果截断/补齐到原句长度（超出 max_len 的部分原样保留）
+        - 仅把中文字符的改动视为纠错，非中文差异（tokenizer 丢失的
+          大小写、全半角等）回填原字符
+
         Args:
-            error_details: pycorrector 返回的错误详情列表
-                          格式: [(wrong_char, correct_char, position), ...]
-                          
+            sentence: 原始句子
+            decoded: 模型解码出的句子
+
         Returns:
-            标准化的错误详情列表
+            (纠正后的句子, 错误详情列表) 元组
         """
+        # 回插被丢弃的字符，保持逐字符对齐
+        for i, original_char in enumerate(sentence):
+            if i >= len(decoded):
+                break
+            if self._is_dropped_char(original_char):
+                decoded = decoded[:i] + original_char + decoded[i:]
+
+        chars = list(decoded[:len(sentence)])
+        if len(chars) < len(sentence):
+            chars.extend(sentence[len(chars):])
+
         errors = []
-        for detail in error_details:
-            if len(detail) >= 3:
-                wrong_char, correct_char, position = detail[0], detail[1], detail[2]
-                errors.append({
-                    "position": position,
-                    "original": wrong_char,
-                    "corrected": correct_char,
-                })
-            elif len(detail) == 2:
-                # 兼容某些版本可能只返回两个元素的情况
-                wrong_char, correct_char = detail[0], detail[1]
-                errors.append({
-                    "position": -1,  # 位置未知
-                    "original": wrong_char,
-                    "corrected": correct_char,
-                })
-        return errors
-    
-    def correct_batch(self, sentences: List[str]) -> List[CorrectionResult]:
+        for i, (original_char, new_char) in enumerate(zip(sentence, chars)):
+            if original_char == new_char:
+                continue
+            if not ('\u4e00' <= new_char <= '\u9fff'):
+                # 非中文输出不可信，回填原字符
+                chars[i] = original_char
+                continue
+            errors.append({
+                "position": i,
+                "original": original_char,
+                "corrected": new_char,
+            })
+        return "".join(chars), errors
+
+    def correct_batch(
+        self,
+        sentences: List[str],
+        batch_size: int = _DEFAULT_BATCH_SIZE,
+        length_bucketing: bool = True
+    ) -> List[CorrectionResult]:
         """
         批量纠错
-        
+
+        整批句子按 batch_size 分片，每片一次编码、一次前向，
+        摊销 tokenizer 和模型调用开销，
+        比逐句调用 correct() 快得多（GPU 上尤其明显）
+
+        开启 length_bucketing 时先按长度排序再分片，
+        使同一 batch 内句子长度相近，减少 padding 浪费的计算量，
+        输出顺序与输入保持一致
+
         Args:
             sentences: 句子列表
-            
+            batch_size: 模型前向的批大小
+            length_bucketing: 是否按长度分桶以减少 padding
+
         Returns:
             CorrectionResult 列表
         """
         if self._corrector is None:
             self.load_model()
-        
+
+        if length_bucketing and len(sentences) > batch_size:
+            order = sorted(range(len(sentences)), key=lambda i: len(sentences[i]))
+            sorted_sents = [sentences[i] for i in order]
+        else:
+            order = None
+            sorted_sents = sentences
+
         results = []
-        for sentence in sentences:
-            result = self.correct(sentence)
-            results.append(result)
-        
-        return results
+        for start in range(0, len(sorted_sents), batch_size):
+            results.extend(self._forward_batch(sorted_sents[start:start + batch_size]))
+
+        if order is None:
+            return results
+
+        # 还原输入顺序
+        final = [None] * len(sentences)
+        for i, result in zip(order, results):
+            final[i] = result
+        return final